@@ -1,14 +1,15 @@
 #!/usr/bin/env python3
 
+import atexit
 from dataclasses import dataclass
 import datetime
+from itertools import islice
 import sqlite3
-from typing import Dict, Tuple
+from typing import Dict, Iterable, Tuple
 from rich.console import Console
 from rich.table import Table
 from rich.panel import Panel
 from rich.prompt import Prompt, IntPrompt, Confirm
-from rich.progress import Progress, SpinnerColumn, TextColumn
 from rich.theme import Theme
 
 # Кастомизируем тему оформления
@@ -23,20 +24,26 @@ custom_theme = Theme({
 })
 console = Console(theme=custom_theme)
 
+# Таблица замены для разделителя разрядов: "152,000" -> "152 000"
+_THOUSANDS_SEP_TRANS = str.maketrans(",", " ")
+
 @dataclass
 class LogRecord:
     mileage: int
-    service_date: datetime.date
+    service_date_iso: str  # дата в формате ISO, как она хранится в БД
     type_: str
     service_description: str
 
 def generate_null_record() -> LogRecord:
-    return LogRecord(0, datetime.date.today(), '', '')
+    return LogRecord(0, datetime.date.today().isoformat(), '', '')
 
-SERVICE_TYPE = {
-    0: 'плановое ТО',
-    1: 'внеплановый ремонт',
-}
+# Код типа обслуживания — индекс в кортеже
+SERVICE_TYPE = (
+    'плановое ТО',
+    'внеплановый ремонт',
+)
+
+_SERVICE_TYPE_CHOICES = [str(code) for code in range(len(SERVICE_TYPE))]
 
 PLANNED_WORK_WITH_PERIOD = {
     0: ("Замена масла в двигателе", 15000),
@@ -53,7 +60,26 @@ PLANNED_WORK_WITH_PERIOD = {
     11: ("Замена масла в АКПП", 100000), 
 }
 
-# SQL-запросы
+_PLANNED_CHOICES = [str(k) for k in PLANNED_WORK_WITH_PERIOD]
+
+# Плановые работы в виде параллельных кортежей для горячего цикла проверки
+WORK_DESCS = tuple(work for work, _ in PLANNED_WORK_WITH_PERIOD.values())
+WORK_PERIODS = tuple(period for _, period in PLANNED_WORK_WITH_PERIOD.values())
+WORK_ADMISSIONS = tuple(period // 10 for period in WORK_PERIODS)  # 10% допуск
+
+# Настройки соединения: WAL и synchronous=NORMAL убирают лишние fsync при записи
+CONNECTION_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA mmap_size=67108864",
+    "PRAGMA cache_size=-8000",
+)
+
+# SQL-запросы.
+# Тексты запросов неизменны и используются как "постоянные" подготовленные
+# выражения: sqlite3 кэширует их в соединении по тексту. Не собирайте SQL
+# внутри методов — новая строка при каждом вызове обходит кэш.
 CREATE_TABLE_SQL = """
 CREATE TABLE IF NOT EXISTS logs (
     id INTEGER PRIMARY KEY AUTOINCREMENT, 
@@ -64,37 +90,73 @@ CREATE TABLE IF NOT EXISTS logs (
 );
 """
 
+CREATE_INDEX_SQL = """
+CREATE INDEX IF NOT EXISTS idx_logs_desc_mileage 
+ON logs (description, mileage DESC)
+"""
+
 CREATE_RECORD_SQL = """
 INSERT INTO logs (mileage, date, type, description) 
 VALUES (?, ?, ?, ?)
 """
 
-GET_LAST_SERVICE_SQL = """
-SELECT mileage 
+GET_LAST_SERVICES_SQL = f"""
+SELECT description, MAX(mileage) 
+FROM logs 
+WHERE description IN ({",".join("?" * len(WORK_DESCS))}) 
+GROUP BY description
+"""
+
+# Дата форматируется на стороне SQLite. Форматируется только существующая дата
+# вида ГГГГ-ММ-ДД (модификатор '+0 days' нормализует несуществующие дни вроде
+# 2024-02-30, и они не проходят сравнение); любое другое значение выводится как хранится
+GET_NEW_RECORDS_SQL = """
+SELECT 
+    id, 
+    mileage, 
+    CASE WHEN date(date, '+0 days') = date THEN strftime('%d.%m.%Y', date) ELSE date END AS date, 
+    type, 
+    description 
 FROM logs 
-WHERE description = ? 
-ORDER BY mileage DESC 
-LIMIT 1
+WHERE id > ? 
+ORDER BY id
 """
 
-GET_ALL_RECORDS_SQL = "SELECT * FROM logs"
+# Количество записей истории на одной странице
+HISTORY_PAGE_SIZE = 50
+
+# Размер кэша подготовленных выражений, с запасом больше числа запросов выше
+STATEMENT_CACHE_SIZE = 128
 
 class CarLogger:
     def __init__(self, db_path: str = 'car_logger.db'):
         self._db_path = db_path
         self._main_table_name = 'logs'
+        # Отформатированные строки истории по ID записи: журнал только
+        # пополняется, поэтому достаточно дочитывать новые записи
+        self._history_cache: Dict[int, Tuple[str, ...]] = {}
+        # Одно долгоживущее соединение: кэш подготовленных запросов
+        # привязан к соединению и сохраняется между вызовами
+        self._conn = sqlite3.connect(
+            db_path,
+            check_same_thread=False,
+            cached_statements=STATEMENT_CACHE_SIZE,
+        )
+        atexit.register(self.close)
+        for pragma in CONNECTION_PRAGMAS:
+            self._conn.execute(pragma)
         self._initialize_database()
-        
-    def _get_connection(self) -> sqlite3.Connection:
-        """Возвращает новое соединение с базой данных"""
-        return sqlite3.connect(self._db_path)
+    
+    def close(self) -> None:
+        """Закрывает соединение с базой данных"""
+        atexit.unregister(self.close)
+        self._conn.close()
     
     def _initialize_database(self) -> None:
-        """Создает таблицу, если она не существует"""
-        with self._get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute(CREATE_TABLE_SQL)
-            conn.commit()
+        """Создает таблицу и индекс, если они не существуют"""
+        with self._conn as conn:
+            conn.execute(CREATE_TABLE_SQL)
+            conn.execute(CREATE_INDEX_SQL)
     
     def check_necessary_service(self, current_mileage: int) -> Dict[str, Tuple[int, int]]:
         """
@@ -103,44 +165,43 @@ class CarLogger:
         """
         service_required = {}
         
-        with self._get_connection() as conn:
-            cursor = conn.cursor()
+        # Один запрос на все работы вместо отдельного запроса на каждую
+        last_mileages = dict(self._conn.execute(GET_LAST_SERVICES_SQL, WORK_DESCS).fetchall())
+        
+        for work_desc, period, admission in zip(WORK_DESCS, WORK_PERIODS, WORK_ADMISSIONS):
+            last_mileage = last_mileages.get(work_desc, 0)
+            next_service = last_mileage + period
             
-            with Progress(
-                SpinnerColumn(),
-                TextColumn("[progress.description]{task.description}"),
-                transient=True,
-            ) as progress:
-                task = progress.add_task("[info]Проверка состояния автомобиля...", total=len(PLANNED_WORK_WITH_PERIOD))
-                
-                for work_id, (work_desc, period) in PLANNED_WORK_WITH_PERIOD.items():
-                    progress.update(task, advance=1, description=f"Проверка: {work_desc[:20]}...")
-                    cursor.execute(GET_LAST_SERVICE_SQL, (work_desc,))
-                    result = cursor.fetchone()
-                    last_mileage = result[0] if result else 0
-                    next_service = last_mileage + period
-                    admission = int(period * 0.1)  # 10% допуск
-                    
-                    if current_mileage >= next_service - admission:
-                        service_required[work_desc] = (last_mileage, next_service)
+            if current_mileage >= next_service - admission:
+                service_required[work_desc] = (last_mileage, next_service)
         
         return service_required
 
+    @staticmethod
+    def _record_params(record: LogRecord) -> Tuple[int, str, str, str]:
+        """Возвращает параметры записи для CREATE_RECORD_SQL"""
+        return (
+            record.mileage, 
+            record.service_date_iso, 
+            record.type_, 
+            record.service_description
+        )
+
     def create_record(self, record: LogRecord) -> int:
         """Создает новую запись в базе данных, возвращает ID записи"""
-        with self._get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute(
+        with self._conn as conn:
+            return conn.execute(CREATE_RECORD_SQL, self._record_params(record)).lastrowid
+
+    def create_records(self, records: Iterable[LogRecord]) -> int:
+        """
+        Создает несколько записей одной транзакцией.
+        Возвращает количество добавленных записей.
+        """
+        with self._conn as conn:
+            return conn.executemany(
                 CREATE_RECORD_SQL,
-                (
-                    record.mileage, 
-                    record.service_date.isoformat(), 
-                    record.type_, 
-                    record.service_description
-                )
-            )
-            conn.commit()
-            return cursor.lastrowid
+                [self._record_params(record) for record in records]
+            ).rowcount
         
     def display_service_status(self, current_mileage: int) -> None:
             """Отображает статус сервиса в виде наглядной панели"""
@@ -174,31 +235,57 @@ class CarLogger:
             table.add_column("Текущий пробег", justify="right")
             table.add_column("Статус", justify="center")
             
+            add_row = table.add_row
+            formatted_mileage = f"{current_mileage:,}".translate(_THOUSANDS_SEP_TRANS)
             for work_desc, (last_mileage, next_service) in service_required.items():
                 status = "[warning]ТРЕБУЕТСЯ![/warning]" if current_mileage >= next_service else "[info]Скоро потребуется[/info]"
-                table.add_row(
+                add_row(
                     work_desc,
-                    f"{last_mileage:,}".replace(",", " "),
-                    f"{next_service:,}".replace(",", " "),
-                    f"{current_mileage:,}".replace(",", " "),
+                    f"{last_mileage:,}".translate(_THOUSANDS_SEP_TRANS),
+                    f"{next_service:,}".translate(_THOUSANDS_SEP_TRANS),
+                    formatted_mileage,
                     status
                 )
             
             console.print(table, justify="center")
 
+    def _update_history_cache(self) -> None:
+        """Дочитывает в кэш истории записи, добавленные после последнего просмотра"""
+        last_id = next(reversed(self._history_cache), 0)
+        
+        for row in self._conn.execute(GET_NEW_RECORDS_SQL, (last_id,)):
+            # Определяем стиль в зависимости от типа обслуживания
+            service_style = "success" if "плановое" in row[3] else "warning"
+            
+            self._history_cache[row[0]] = (
+                str(row[0]),
+                f"{row[1]:,}".translate(_THOUSANDS_SEP_TRANS),
+                row[2],
+                f"[{service_style}]{row[3]}[/]",
+                row[4]
+            )
+
     def show_service_history(self) -> None:
         """Отображает историю обслуживания в виде красивой таблицы"""
-        with self._get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute(GET_ALL_RECORDS_SQL)
-            rows = cursor.fetchall()
+        self._update_history_cache()
+        
+        if not self._history_cache:
+            console.print("[warning]История обслуживания пуста[/warning]", justify="center")
+            return
+            
+        # Страницы читаются прямо из кэша, без копирования всей истории
+        rows = iter(self._history_cache.values())
+        total = len(self._history_cache)
+        for start in range(0, total, HISTORY_PAGE_SIZE):
+            page_size = min(HISTORY_PAGE_SIZE, total - start)
+            if start and not Confirm.ask(
+                f"[prompt]Показать следующие записи ({page_size} шт.)?[/prompt]",
+                default=True
+            ):
+                break
             
-            if not rows:
-                console.print("[warning]История обслуживания пуста[/warning]", justify="center")
-                return
-                
             table = Table(
-                title="\nИстория обслуживания автомобиля",
+                title="\nИстория обслуживания автомобиля" if not start else None,
                 title_style="header",
                 show_header=True,
                 header_style="menu",
@@ -212,84 +299,12 @@ class CarLogger:
             table.add_column("Тип обслуживания", min_width=20)
             table.add_column("Описание работ", min_width=35)
             
-            for row in rows:
-                # Форматируем дату
-                try:
-                    # Пытаемся преобразовать строку в дату
-                    service_date = datetime.date.fromisoformat(row[2])
-                except ValueError:
-                    # Если не получается, оставляем как есть
-                    formatted_date = row[2]
-                else:
-                    formatted_date = service_date.strftime("%d.%m.%Y")
-                # Определяем стиль в зависимости от типа обслуживания
-                service_style = "success" if "плановое" in row[3] else "warning"
-                
-                table.add_row(
-                    str(row[0]),
-                    f"{row[1]:,}".replace(",", " "),
-                    formatted_date,
-                    f"[{service_style}]{row[3]}[/]",
-                    row[4]
-                )
+            add_row = table.add_row
+            for row in islice(rows, page_size):
+                add_row(*row)
             
             console.print(table, justify="center")
 
-def display_planned_services(show_title: bool = True) -> None:
-    """Отображает плановые сервисные работы с улучшенным оформлением"""
-    if show_title:
-        console.rule("[header]Процедуры планового ТО[/header]", align="center")
-    
-    table = Table(
-        title="\nПериодичность планового технического обслуживания" if show_title else None,
-        title_style="header",
-        show_header=True,
-        header_style="menu",
-        width=70,
-        show_lines=True,
-    )
-    table.add_column("Код", style="info", justify="center", width=8)
-    table.add_column("Процедура", min_width=45)
-    table.add_column("Интервал (км)", justify="right", width=15)
-    
-    for code, (work, interval) in PLANNED_WORK_WITH_PERIOD.items():
-        table.add_row(
-            f"[bold]{code}[/bold]",
-            work,
-            f"[bold]{interval // 1000} тыс.[/bold]"
-        )
-    
-    # Добавляем поясняющую панель
-    if show_title:
-        console.print(
-            Panel(
-                "В этом разделе представлен полный перечень регулярных\n"
-                "технических процедур с рекомендованными интервалами\n"
-                "пробега для вашего автомобиля",
-                title="ℹ️ Информация",
-                title_align="left",
-                style="info",
-                width=70,
-                padding=(1, 2)
-            ),
-            justify="center"
-        )
-        console.print()
-    
-    console.print(table, justify="center")
-    
-    if show_title:
-        console.print(
-            Panel(
-                "[bold]Важно:[/bold] Фактические интервалы могут отличаться в зависимости "
-                "от условий эксплуатации, рекомендаций производителя и технического состояния автомобиля",
-                style="warning",
-                width=70,
-                padding=(1, 2)
-            ),
-            justify="center"
-        )
-
 
 def display_main_menu() -> None:
     """Отображает главное меню"""
@@ -324,7 +339,7 @@ def display_service_types() -> None:
     table.add_column("Код", style="info", justify="center")
     table.add_column("Тип обслуживания")
     
-    for code, service_type in SERVICE_TYPE.items():
+    for code, service_type in enumerate(SERVICE_TYPE):
         table.add_row(str(code), service_type)
     
     console.print(table, justify="center")
@@ -417,12 +432,11 @@ def main():
             new_record = generate_null_record()
             
             new_record.mileage = IntPrompt.ask("[prompt]Введите пробег автомобиля (км)[/prompt]")
-            new_record.service_date = datetime.date.today()
             
             display_service_types()
             service_type = IntPrompt.ask(
                 "[prompt]Выберите тип обслуживания[/prompt]", 
-                choices=[str(k) for k in SERVICE_TYPE.keys()]
+                choices=_SERVICE_TYPE_CHOICES
             )
             new_record.type_ = SERVICE_TYPE[service_type]
             
@@ -430,7 +444,7 @@ def main():
                 display_planned_services(show_title=False)  # Упрощенное отображение
                 work_type = IntPrompt.ask(
                     "[prompt]Выберите выполненную работу[/prompt]", 
-                    choices=[str(k) for k in PLANNED_WORK_WITH_PERIOD.keys()]
+                    choices=_PLANNED_CHOICES
                 )
                 new_record.service_description = PLANNED_WORK_WITH_PERIOD[int(work_type)][0]
             else:  # Внеплановый ремонт